@@ -1,14 +1,17 @@
 # backend/main.py
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 import aiohttp
 import asyncio
-from typing import List, Dict, Any, Optional
-import json
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import orjson
 import re
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Allow CORS for frontend during development
 app.add_middleware(
@@ -24,12 +27,119 @@ import os
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 HEADERS = {"Authorization": f"token {GITHUB_TOKEN}"}
 
+GITHUB_URL_RE = re.compile(r"(?:https?:\/\/)?(?:www\.)?github\.com\/(?P<owner>[^\/\s]+)\/(?P<repo>[^\/\s]+)")
+
+# GraphQL fetches this many directory levels per query; deeper trees take more queries
+GRAPHQL_DEPTH = 3
+GRAPHQL_FOLLOWUP_BATCH = 20
+# Blob text is fetched per batch of paths, only for files that actually get summarized
+GRAPHQL_BLOB_BATCH = 25
+# GitHub's secondary rate limits punish bursts of concurrent GraphQL POSTs
+GRAPHQL_CONCURRENCY = 4
+
 # GROQ API key
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_TEMPERATURE = 0.2
+# Per-file summaries are short and don't need the 70B model
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+SUMMARY_MAX_TOKENS = 256
+GROQ_ERROR_PREFIXES = ("Error generating response", "GROQ API key not configured")
 
 if not GROQ_API_KEY:
     print("Warning: GROQ_API_KEY environment variable not set. GPT features will error.")
 
+# 🗃️ Exact-match caches: commit trees and blob SHAs are immutable, so entries never go stale
+REPO_CACHE_SIZE = 512
+FILE_CACHE_SIZE = 8192
+repo_cache: "OrderedDict[str, bytes]" = OrderedDict()
+file_cache: "OrderedDict[str, str]" = OrderedDict()
+GROQ_CACHE_SIZE = 4096
+groq_cache: "OrderedDict[str, str]" = OrderedDict()
+groq_inflight: Dict[str, "asyncio.Future[str]"] = {}
+ETAG_CACHE_SIZE = 256
+etag_cache: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+repo_inflight: Dict[Tuple[str, str, bool], "asyncio.Future[bytes]"] = {}
+
+def cache_get(cache: OrderedDict, key: str):
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    return None
+
+def cache_put(cache: OrderedDict, key: str, value: Any, maxsize: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+# 🚫 Files that never get sent to the LLM (vendored, generated, binary or too large)
+SKIP_DIRS = {"node_modules", "dist", "build", ".git", "vendor", "__pycache__"}
+SKIP_EXTS = (".png", ".jpg", ".jpeg", ".gif", ".ico", ".pdf", ".zip", ".tar", ".gz", ".woff", ".woff2", ".ttf", ".mp4", ".lock", ".min.js", ".map")
+SKIP_FILES = {"package-lock.json", "pnpm-lock.yaml"}
+MAX_BYTES = 64 * 1024
+SKIPPED_SUMMARY = "(skipped: binary/large/vendored)"
+FETCH_FAILED_SUMMARY = "Could not fetch file content."
+EMPTY_SUMMARY = "(empty file)"
+
+# 📦 Several small files share one Groq call
+SUMMARY_BATCH_SIZE = 8
+SUMMARY_BATCH_CHARS = 30_000
+
+# 🚦 Separate limits for raw file fetches and Groq calls
+FETCH_CONCURRENCY = 16
+LLM_CONCURRENCY = 8
+
+def should_skip(parts: List[str], size: Optional[int], binary: bool = False) -> bool:
+    if binary:
+        return True
+    name = parts[-1].lower()
+    if name in SKIP_FILES or name.endswith(SKIP_EXTS):
+        return True
+    if size is not None and size > MAX_BYTES:
+        return True
+    return any(p in SKIP_DIRS for p in parts[:-1])
+
+def file_cache_key(path: str, blob_sha: str) -> str:
+    return hashlib.sha256(f"{path}\0{blob_sha}\0{SUMMARY_MODEL}".encode()).hexdigest()
+
+async def warm_groq_pool(session: aiohttp.ClientSession):
+    # Open LLM_CONCURRENCY keep-alive connections up front so the first summaries skip the TLS handshake
+    async def ping():
+        async with session.get("https://api.groq.com/openai/v1/models", headers={"Authorization": f"Bearer {GROQ_API_KEY}"}) as response:
+            await response.read()
+    await asyncio.gather(*(ping() for _ in range(LLM_CONCURRENCY)), return_exceptions=True)
+
+@app.on_event("startup")
+async def startup():
+    # One pooled session for GitHub + Groq; limit_per_host keeps raw.githubusercontent fan-out polite
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=20,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True,
+            force_close=False,
+        ),
+        timeout=aiohttp.ClientTimeout(total=60),
+    )
+    if GROQ_API_KEY:
+        # Warm in the background so startup isn't blocked on Groq
+        app.state.groq_warmup = asyncio.create_task(warm_groq_pool(app.state.http))
+    # Dev convenience; set AUTO_CREATE_TABLES=0 where migrations own the schema
+    if os.getenv("DATABASE_URL") and os.getenv("AUTO_CREATE_TABLES", "1") == "1":
+        from database import Base, engine
+        import models  # noqa: F401 -- registers tables on Base.metadata
+        await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+
+@app.on_event("shutdown")
+async def shutdown():
+    warmup = getattr(app.state, "groq_warmup", None)
+    if warmup:
+        warmup.cancel()
+    await app.state.http.close()
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -37,154 +147,485 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
 
-async def fetch_json(session: aiohttp.ClientSession, url: str, headers: Optional[Dict[str, str]] = None):
+async def fetch_json(session: aiohttp.ClientSession, url: str, headers: Optional[Dict[str, str]] = None, use_etag: bool = False):
+    # Opt-in: only small, rarely-changing payloads (repo metadata) are worth keeping parsed in memory
+    etag, cached = etag_cache.get(url, (None, None)) if use_etag else (None, None)
+    if etag:
+        # GitHub doesn't charge rate limit for a 304
+        headers = {**(headers or {}), "If-None-Match": etag}
     async with session.get(url, headers=headers) as response:
-        text = await response.text()
+        if response.status == 304 and cached is not None:
+            etag_cache.move_to_end(url)
+            return cached
+        data = await response.read()
         if response.status >= 400:
-            raise HTTPException(status_code=response.status, detail=f"HTTP {response.status} from {url}: {text[:300]}")
-        return json.loads(text)
+            raise HTTPException(status_code=response.status, detail=f"HTTP {response.status} from {url}: {data[:300].decode(errors='replace')}")
+        parsed = orjson.loads(data)
+        if use_etag and response.headers.get("ETag"):
+            cache_put(etag_cache, url, (response.headers["ETag"], parsed), ETAG_CACHE_SIZE)
+        return parsed
 
-async def fetch_text(session: aiohttp.ClientSession, url: str):
+async def fetch_text(session: aiohttp.ClientSession, url: str, max_bytes: int = MAX_BYTES):
     async with session.get(url) as response:
         if response.status != 200:
             return None
-        return await response.text()
+        # Bounded read: never buffer more of a file than we'd put in a prompt.
+        # StreamReader.read(n) returns whatever is buffered, so loop until EOF or the budget is spent.
+        buf = bytearray()
+        while len(buf) < max_bytes:
+            chunk = await response.content.read(max_bytes - len(buf))
+            if not chunk:
+                break
+            buf += chunk
+        return buf.decode("utf-8", errors="replace")
+
+async def fetch_graphql(session: aiohttp.ClientSession, query: str, variables: Dict[str, Any]):
+    async with session.post("https://api.github.com/graphql", headers=HEADERS, json={"query": query, "variables": variables}) as response:
+        data = await response.read()
+        if response.status >= 400:
+            raise HTTPException(status_code=response.status, detail=f"HTTP {response.status} from GitHub GraphQL: {data[:300].decode(errors='replace')}")
+        body = orjson.loads(data)
+        if body.get("errors"):
+            raise HTTPException(status_code=502, detail=f"GitHub GraphQL error: {body['errors'][0].get('message', '')[:300]}")
+        return body["data"]
+
+async def request_groq(session: aiohttp.ClientSession, messages: List[Dict[str, str]], max_tokens: int, temperature: float, model: str) -> str:
+    async with session.post(
+        "https://api.groq.com/openai/v1/chat/completions",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+        },
+        json={
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+    ) as response:
+        raw = await response.read()
+        if response.status != 200:
+            return f"Error generating response: {response.status} - {raw[:400].decode(errors='replace')}"
+        data = orjson.loads(raw)
+        try:
+            return data["choices"][0]["message"]["content"]
+        except Exception:
+            # Keep the error prefix so this never lands in groq_cache/file_cache
+            return f"Error generating response: unexpected payload - {orjson.dumps(data).decode()[:1000]}"
 
-async def get_groq_response(messages: List[Dict[str, str]]) -> str:
+async def get_groq_response(session: aiohttp.ClientSession, messages: List[Dict[str, str]], *, max_tokens: int = 1024, temperature: float = GROQ_TEMPERATURE, model: str = GROQ_MODEL) -> str:
     if not GROQ_API_KEY:
         return "GROQ API key not configured (server)."
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-            },
-            json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": messages,
-                "temperature": 0.2,
-                "max_tokens": 1024,
-            },
-            timeout=60
-        ) as response:
-            text = await response.text()
-            if response.status != 200:
-                return f"Error generating response: {response.status} - {text[:400]}"
-            data = json.loads(text)
-            try:
-                return data["choices"][0]["message"]["content"]
-            except Exception:
-                return json.dumps(data)[:1000]
+    key = hashlib.sha256(orjson.dumps({"m": model, "t": temperature, "n": max_tokens, "msg": messages}, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    cached = cache_get(groq_cache, key)
+    if cached is not None:
+        return cached
+    # Single-flight: identical concurrent prompts share one upstream call
+    task = groq_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(request_groq(session, messages, max_tokens, temperature, model))
+        groq_inflight[key] = task
+        task.add_done_callback(lambda _: groq_inflight.pop(key, None))
+    text = await asyncio.shield(task)
+    if not text.startswith(GROQ_ERROR_PREFIXES):
+        cache_put(groq_cache, key, text, GROQ_CACHE_SIZE)
+    return text
 
 def parse_github_url(url: str) -> Optional[Dict[str, str]]:
     if not url:
         return None
     url = url.strip().replace("git@github.com:", "https://github.com/").replace("github.com:", "github.com/")
-    m = re.search(r"(?:https?:\/\/)?(?:www\.)?github\.com\/(?P<owner>[^\/\s]+)\/(?P<repo>[^\/\s]+)", url)
+    m = GITHUB_URL_RE.search(url)
     if not m:
         return None
     owner = m.group("owner")
-    repo = m.group("repo").replace(".git", "")
+    repo = m.group("repo").removesuffix(".git")
     return {"owner": owner, "repo": repo}
 
 def build_hierarchy(items: List[Dict[str, str]]) -> Dict[str, Any]:
-    root = {"name": "/", "children": [], "path": ""}
+    root = {"name": "/", "children": [], "path": "", "_children_by_name": {}}
     for item in items:
         parts = item["path"].split("/")
         node = root
+        current_path = ""
         for i, p in enumerate(parts):
-            child = next((c for c in node["children"] if c["name"] == p), None)
+            child = node["_children_by_name"].get(p)
             if not child:
                 child = {
                     "name": p,
                     "children": [],
-                    "path": node["path"] + "/" + p if node["path"] else p,
-                    "isFile": i == len(parts) - 1 and item.get("type") == "blob"
+                    "path": current_path + "/" + p if current_path else p,
+                    "isFile": i == len(parts) - 1 and item.get("type") == "blob",
+                    "_children_by_name": {},
                 }
+                if child["isFile"]:
+                    if item.get("sha"):
+                        child["sha"] = item["sha"]
+                    if item.get("size") == 0:
+                        # Empty __init__.py / .gitkeep / py.typed: nothing to fetch or summarize
+                        child["summary"] = EMPTY_SUMMARY
+                    elif should_skip(parts, item.get("size"), bool(item.get("binary"))):
+                        child["summary"] = SKIPPED_SUMMARY
                 node["children"].append(child)
+                node["_children_by_name"][p] = child
             node = child
+            current_path = child["path"]
+    # Drop the lookup index so it never reaches the response
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        del n["_children_by_name"]
+        stack.extend(n["children"])
     return root
 
 def sort_tree(node: Dict[str, Any]):
-    if "children" in node:
-        node["children"].sort(key=lambda x: (not x.get("isFile", False), x["name"]))
-        for child in node["children"]:
-            sort_tree(child)
-
-async def generate_summaries(node: Dict[str, Any], owner: str, repo: str, branch_sha: str, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore):
-    if node.get("isFile"):
-        raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch_sha}/{node['path']}"
-        async with semaphore:
-            txt = await fetch_text(session, raw_url)
-        if txt:
-            prompt = f"Provide a concise summary of this code file for software engineers. Highlight key functions, imports, and architecture. File: {node['path']}\n\n{txt}"
-            node["summary"] = await get_groq_response([{"role": "user", "content": prompt}])
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if "children" in n:
+            n["children"].sort(key=lambda x: (not x.get("isFile", False), x["name"]))
+            stack.extend(n["children"])
+
+def file_prompt(path: str, txt: str) -> str:
+    return f"Provide a concise summary of this code file for software engineers. Highlight key functions, imports, and architecture. File: {path}\n\n{txt}"
+
+def batch_prompt(files: List[Dict[str, Any]]) -> str:
+    body = "\n\n".join(f"=== File: {f['node']['path']} ===\n{f['txt']}" for f in files)
+    return (
+        "Provide a concise summary of each of the following code files for software engineers. "
+        "Highlight key functions, imports, and architecture. "
+        "Respond ONLY with a JSON object mapping each file path to its summary string.\n\n" + body
+    )
+
+def parse_batch_response(text: str) -> Optional[Dict[str, str]]:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        data = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+async def summarize_batch(batch: List[Dict[str, Any]], session: aiohttp.ClientSession, llm_sem: asyncio.Semaphore):
+    if len(batch) == 1:
+        f = batch[0]
+        async with llm_sem:
+            f["node"]["summary"] = await get_groq_response(session, [{"role": "user", "content": file_prompt(f["node"]["path"], f["txt"])}], max_tokens=SUMMARY_MAX_TOKENS, model=SUMMARY_MODEL)
+        return
+    async with llm_sem:
+        text = await get_groq_response(session, [{"role": "user", "content": batch_prompt(batch)}], max_tokens=SUMMARY_MAX_TOKENS * len(batch), model=SUMMARY_MODEL)
+    if text.startswith(GROQ_ERROR_PREFIXES):
+        for f in batch:
+            f["node"]["summary"] = text
+        return
+    summaries = parse_batch_response(text) or {}
+    missing = []
+    for f in batch:
+        summary = summaries.get(f["node"]["path"])
+        if isinstance(summary, str) and summary:
+            f["node"]["summary"] = summary
+        else:
+            missing.append(f)
+    # Anything the model dropped or mangled falls back to a single-file call
+    if missing:
+        await asyncio.gather(*(summarize_batch([f], session, llm_sem) for f in missing))
+
+async def generate_summaries(root: Dict[str, Any], owner: str, repo: str, ref: str, session: aiohttp.ClientSession, fetch_sem: asyncio.Semaphore, llm_sem: asyncio.Semaphore, gql_sem: Optional[asyncio.Semaphore] = None):
+    # ref is the snapshot's commit oid; with gql_sem blob text comes from GraphQL and raw fetches are the fallback
+    pending = []
+    stack = [root]
+    while stack:
+        n = stack.pop()
+        stack.extend(n.get("children", []))
+        if not n.get("isFile") or "summary" in n:
+            continue
+        key = file_cache_key(n["path"], n["sha"]) if n.get("sha") else None
+        cached = cache_get(file_cache, key) if key else None
+        if cached is not None:
+            n["summary"] = cached
+        else:
+            pending.append({"node": n, "key": key})
+
+    # Pipeline: fetchers -> files_q -> batcher -> batch_q -> LLM workers, so fetching overlaps generation
+    files_q: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=SUMMARY_BATCH_SIZE * LLM_CONCURRENCY)
+    batch_q: "asyncio.Queue[Optional[List[Dict[str, Any]]]]" = asyncio.Queue(maxsize=LLM_CONCURRENCY * 2)
+
+    async def fetch(f):
+        # "" is a real (empty) GraphQL blob text; only a missing text needs the raw fallback
+        if f.get("txt") is None:
+            raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{ref}/{f['node']['path']}"
+            async with fetch_sem:
+                f["txt"] = await fetch_text(session, raw_url)
+        if f["txt"] is None:
+            f["node"]["summary"] = FETCH_FAILED_SUMMARY
+        elif not f["txt"]:
+            f["node"]["summary"] = EMPTY_SUMMARY
+        else:
+            await files_q.put(f)
+
+    async def fetch_chunk(chunk):
+        try:
+            async with gql_sem:
+                texts = await fetch_blob_texts(session, owner, repo, ref, [f["node"]["path"] for f in chunk])
+        except Exception:
+            texts = {}
+        for f in chunk:
+            f["txt"] = texts.get(f["node"]["path"])
+        await asyncio.gather(*(fetch(f) for f in chunk))
+
+    async def produce():
+        if gql_sem:
+            chunks = [pending[i:i + GRAPHQL_BLOB_BATCH] for i in range(0, len(pending), GRAPHQL_BLOB_BATCH)]
+            await asyncio.gather(*(fetch_chunk(c) for c in chunks))
         else:
-            node["summary"] = "Could not fetch file content."
-    else:
-        coros = [generate_summaries(c, owner, repo, branch_sha, session, semaphore) for c in node.get("children", [])]
-        if coros:
-            await asyncio.gather(*coros)
+            await asyncio.gather(*(fetch(f) for f in pending))
+        await files_q.put(None)
+
+    async def batcher():
+        current, size = [], 0
+        while (f := await files_q.get()) is not None:
+            n = len(f["txt"])
+            if n > SUMMARY_BATCH_CHARS:
+                # Oversized files still go out on their own
+                await batch_q.put([f])
+                continue
+            if current and (len(current) >= SUMMARY_BATCH_SIZE or size + n > SUMMARY_BATCH_CHARS):
+                await batch_q.put(current)
+                current, size = [], 0
+            current.append(f)
+            size += n
+        if current:
+            await batch_q.put(current)
+        for _ in range(LLM_CONCURRENCY):
+            await batch_q.put(None)
+
+    async def worker():
+        while (batch := await batch_q.get()) is not None:
+            await summarize_batch(batch, session, llm_sem)
+            for f in batch:
+                if f["key"] and not f["node"]["summary"].startswith(GROQ_ERROR_PREFIXES):
+                    cache_put(file_cache, f["key"], f["node"]["summary"], FILE_CACHE_SIZE)
+
+    tasks = [asyncio.ensure_future(c) for c in (produce(), batcher(), *(worker() for _ in range(LLM_CONCURRENCY)))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
 
 def collect_summaries(node: Dict[str, Any]) -> str:
     summaries = []
-    def traverse(n):
+    stack = [node]
+    while stack:
+        n = stack.pop()
         if n.get("isFile"):
             summaries.append(f"File: {n['path']}\nSummary: {n.get('summary', 'N/A')}\n")
-        for c in n.get("children", []):
-            traverse(c)
-    traverse(node)
+        # Push reversed so files come out in the same pre-order as the tree
+        stack.extend(reversed(n.get("children", [])))
     return "\n".join(summaries)
 
-@app.get("/api/repo")
-async def get_repo(url: str):
-    parsed = parse_github_url(url)
-    if not parsed:
-        raise HTTPException(status_code=400, detail="Invalid GitHub URL")
-    owner, repo = parsed["owner"], parsed["repo"]
+def summaries_ok(node: Dict[str, Any]) -> bool:
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        # Failed fetches (429/5xx, branch moved under us) are as transient as Groq errors
+        if n.get("isFile") and (n.get("summary", "").startswith(GROQ_ERROR_PREFIXES) or n.get("summary") == FETCH_FAILED_SUMMARY):
+            return False
+        stack.extend(n.get("children", []))
+    return True
+
+def graphql_entries(depth: int) -> str:
+    subtree = f"... on Tree {{ oid {graphql_entries(depth - 1)} }}" if depth else "... on Tree { oid }"
+    return f"entries {{ name type object {{ ... on Blob {{ oid byteSize isBinary }} {subtree} }} }}"
+
+def collect_graphql_tree(tree: Dict[str, Any], prefix: str, items: List[Dict[str, Any]], pending: List[str]):
+    stack = [(tree, prefix)]
+    while stack:
+        obj, base = stack.pop()
+        for e in obj.get("entries") or []:
+            path = base + e["name"]
+            o = e.get("object") or {}
+            if e["type"] == "blob":
+                items.append({"path": path, "type": "blob", "sha": o.get("oid"), "size": o.get("byteSize"), "binary": o.get("isBinary")})
+            elif e["type"] == "tree":
+                items.append({"path": path, "type": "tree", "sha": o.get("oid")})
+                if "entries" in o:
+                    stack.append((o, path + "/"))
+                else:
+                    pending.append(path)
+
+async def fetch_graphql_head(session: aiohttp.ClientSession, owner: str, repo: str) -> Dict[str, str]:
+    # Cheap first call: just enough to key repo_cache before downloading any entries or blob text
+    query = (
+        "query($owner: String!, $name: String!) { repository(owner: $owner, name: $name) { "
+        "defaultBranchRef { name target { ... on Commit { oid tree { oid } } } } } }"
+    )
+    data = await fetch_graphql(session, query, {"owner": owner, "name": repo})
+    branch = (data.get("repository") or {}).get("defaultBranchRef")
+    if not branch:
+        raise HTTPException(status_code=404, detail=f"No default branch for {owner}/{repo}")
+    return {"default_branch": branch["name"], "commit_oid": branch["target"]["oid"], "tree_sha": branch["target"]["tree"]["oid"]}
+
+async def fetch_repo_graphql(session: aiohttp.ClientSession, owner: str, repo: str, head: Dict[str, str], gql_sem: asyncio.Semaphore) -> Dict[str, Any]:
+    variables = {"owner": owner, "name": repo}
+    items = []
 
-    async with aiohttp.ClientSession() as session:
+    async def follow_up(paths: List[str]):
+        # One aliased object() lookup per directory, GRAPHQL_DEPTH levels each, pinned to the head commit
+        fields = " ".join(
+            f"t{i}: object(expression: {orjson.dumps(head['commit_oid'] + ':' + p).decode()}) {{ ... on Tree {{ oid {graphql_entries(GRAPHQL_DEPTH)} }} }}"
+            for i, p in enumerate(paths)
+        )
+        async with gql_sem:
+            sub = await fetch_graphql(session, f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {fields} }} }}", variables)
+        found = []
+        for i, p in enumerate(paths):
+            collect_graphql_tree(sub["repository"].get(f"t{i}") or {}, p + "/" if p else "", items, found)
+        return found
+
+    # "" is the root tree
+    pending = [""]
+    while pending:
+        chunks = [pending[i:i + GRAPHQL_FOLLOWUP_BATCH] for i in range(0, len(pending), GRAPHQL_FOLLOWUP_BATCH)]
+        pending = [p for found in await asyncio.gather(*(follow_up(c) for c in chunks)) for p in found]
+
+    return {"default_branch": head["default_branch"], "commit_oid": head["commit_oid"], "tree_sha": head["tree_sha"], "items": items, "graphql": True}
+
+async def fetch_blob_texts(session: aiohttp.ClientSession, owner: str, repo: str, commit_oid: str, paths: List[str]) -> Dict[str, str]:
+    fields = " ".join(
+        f"b{i}: object(expression: {orjson.dumps(commit_oid + ':' + p).decode()}) {{ ... on Blob {{ isBinary text }} }}"
+        for i, p in enumerate(paths)
+    )
+    data = await fetch_graphql(session, f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {fields} }} }}", {"owner": owner, "name": repo})
+    texts = {}
+    for i, p in enumerate(paths):
+        blob = data["repository"].get(f"b{i}") or {}
+        if blob.get("text") is not None and not blob.get("isBinary"):
+            texts[p] = blob["text"][:MAX_BYTES]
+    return texts
+
+async def fetch_repo_rest(session: aiohttp.ClientSession, owner: str, repo: str) -> Dict[str, Any]:
+    # Metadata, head commit and tree in parallel; the commit pins raw fetches to the same snapshot as the tree
+    base = f"https://api.github.com/repos/{owner}/{repo}"
+    repo_meta, commit, tree_resp = await asyncio.gather(
+        fetch_json(session, base, headers=HEADERS, use_etag=True),
+        fetch_json(session, f"{base}/commits/HEAD", headers=HEADERS),
+        fetch_json(session, f"{base}/git/trees/HEAD?recursive=1", headers=HEADERS),
+        return_exceptions=True,
+    )
+    if isinstance(repo_meta, Exception):
+        raise repo_meta
+    default_branch = repo_meta.get("default_branch", "main")
+    if isinstance(commit, Exception):
+        commit = await fetch_json(session, f"{base}/commits/{default_branch}", headers=HEADERS)
+    tree_sha = commit["commit"]["tree"]["sha"]
+    if isinstance(tree_resp, Exception) or tree_resp.get("sha") != tree_sha:
+        # HEAD moved between the two calls (or the tree call failed): fetch the commit's own tree
+        tree_resp = await fetch_json(session, f"{base}/git/trees/{tree_sha}?recursive=1", headers=HEADERS)
+    items = [{"path": t["path"], "type": t["type"], "sha": t.get("sha"), "size": t.get("size")} for t in tree_resp.get("tree", []) if t["type"] in ("blob", "tree")]
+    return {"default_branch": default_branch, "commit_oid": commit["sha"], "tree_sha": tree_sha, "items": items}
+
+async def build_repo_response(session: aiohttp.ClientSession, owner: str, repo: str, include_summaries: bool) -> bytes:
+    snapshot = None
+    gql_sem = asyncio.Semaphore(GRAPHQL_CONCURRENCY)
+    if GITHUB_TOKEN and include_summaries:
+        # GraphQL returns the tree and blob text in a few round trips but needs auth; REST is the fallback
+        # (and the only path for navigation-only requests, which don't need blob text)
         try:
-            repo_meta = await fetch_json(session, f"https://api.github.com/repos/{owner}/{repo}", headers=HEADERS)
-            default_branch = repo_meta.get("default_branch", "main")
+            head = await fetch_graphql_head(session, owner, repo)
+        except Exception:
+            head = None
+        if head:
+            cached = cache_get(repo_cache, f"{owner}/{repo}/{head['tree_sha']}")
+            if cached is not None:
+                return cached
+            try:
+                snapshot = await fetch_repo_graphql(session, owner, repo, head, gql_sem)
+            except Exception:
+                snapshot = None
+    if snapshot is None:
+        snapshot = await fetch_repo_rest(session, owner, repo)
 
-            ref = await fetch_json(session, f"https://api.github.com/repos/{owner}/{repo}/git/refs/heads/{default_branch}", headers=HEADERS)
-            commit_sha = ref["object"]["sha"]
+    cache_key = f"{owner}/{repo}/{snapshot['tree_sha']}"
+    # Cached bodies are already-serialized JSON, so a hit costs no encoding at all.
+    # They carry full summaries, so navigation-only requests never read them.
+    if include_summaries:
+        cached = cache_get(repo_cache, cache_key)
+        if cached is not None:
+            return cached
 
-            commit_obj = await fetch_json(session, f"https://api.github.com/repos/{owner}/{repo}/git/commits/{commit_sha}", headers=HEADERS)
-            tree_sha = commit_obj["tree"]["sha"]
+    blobs = snapshot["items"]
+    root = build_hierarchy(blobs)
+    if not include_summaries:
+        # Navigation-only: tree shape without the LLM stage, so drop the skip placeholders too
+        sort_tree(root)
+        stack = [root]
+        while stack:
+            n = stack.pop()
+            n.pop("summary", None)
+            stack.extend(n["children"])
+        return orjson.dumps({"tree": root, "summaries": "", "repo": f"{owner}/{repo}", "fileCount": len(blobs)})
+    fetch_sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+    llm_sem = asyncio.Semaphore(LLM_CONCURRENCY)
+    # Both paths pin file text to the tree's commit; GraphQL snapshots also pull that text via GraphQL
+    await generate_summaries(root, owner, repo, snapshot["commit_oid"], session, fetch_sem, llm_sem, gql_sem if snapshot.get("graphql") else None)
+    sort_tree(root)
 
-            tree_resp = await fetch_json(session, f"https://api.github.com/repos/{owner}/{repo}/git/trees/{tree_sha}?recursive=1", headers=HEADERS)
-            blobs = [{"path": t["path"], "type": t["type"]} for t in tree_resp.get("tree", []) if t["type"] in ("blob", "tree")]
+    # Serialize once with orjson, skipping FastAPI's jsonable_encoder walk
+    content = orjson.dumps({"tree": root, "summaries": collect_summaries(root), "repo": f"{owner}/{repo}", "fileCount": len(blobs)})
+    # Only cache fully summarized trees so transient fetch/Groq failures get retried
+    if summaries_ok(root):
+        cache_put(repo_cache, cache_key, content, REPO_CACHE_SIZE)
+    return content
 
-            root = build_hierarchy(blobs)
-            semaphore = asyncio.Semaphore(6)
-            await generate_summaries(root, owner, repo, tree_sha, session, semaphore)
-            sort_tree(root)
+@app.get("/api/repo")
+async def get_repo(url: str, include_summaries: bool = True):
+    parsed = parse_github_url(url)
+    if not parsed:
+        raise HTTPException(status_code=400, detail="Invalid GitHub URL")
+    owner, repo = parsed["owner"], parsed["repo"]
 
-            return {"tree": root, "summaries": collect_summaries(root), "repo": f"{owner}/{repo}", "fileCount": len(blobs)}
-        except HTTPException as e:
-            raise e
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    try:
+        # Single-flight: concurrent requests for the same repo await one build instead of each summarizing it
+        key = (owner, repo, include_summaries)
+        task = repo_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(build_repo_response(app.state.http, owner, repo, include_summaries))
+            repo_inflight[key] = task
+            task.add_done_callback(lambda _: repo_inflight.pop(key, None))
+        content = await asyncio.shield(task)
+        return Response(content=content, media_type="application/json")
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/chat")
 async def chat_completion(request: ChatRequest):
     try:
-        messages = [m.dict() for m in request.messages]
-        response = await get_groq_response(messages)
+        messages = [m.model_dump() for m in request.messages]
+        response = await get_groq_response(app.state.http, messages)
         return {"content": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/summary")
-async def generate_summary(body: Dict[str, Any] = Body(...)):
-    tree_str = json.dumps(body.get("tree", {}))
+async def generate_summary(request: Request):
+    # Raw body + one orjson parse: skips Pydantic validation of the (possibly multi-MB) tree
+    raw = await request.body()
+    try:
+        body = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Expected a JSON object")
+    tree_str = orjson.dumps(body.get("tree", {})).decode()
     summaries_str = body.get("summaries", "")
     prompt = f"Provide a professional overview of this repository. Analyze structure, tech stack, key components, and suggestions. Repo structure:\n{tree_str}\nSummaries:\n{summaries_str}"
     try:
-        response = await get_groq_response([{"role": "user", "content": prompt}])
+        response = await get_groq_response(app.state.http, [{"role": "user", "content": prompt}])
         return {"content": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
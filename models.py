@@ -1,7 +1,7 @@
 # models.py
 from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
-from database import Base,engine
+from database import Base
 
 class User(Base):
     __tablename__ = "users"
@@ -18,7 +18,3 @@ class Chat(Base):
     content = Column(String)
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="chats")
- 
-
- # Drops all tables (dangerous for prod)
-Base.metadata.create_all(bind=engine) 
\ No newline at end of file